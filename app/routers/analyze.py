@@ -1,22 +1,38 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
 import base64
 import io
+import logging
+import numpy as np
+from typing import Optional, Tuple
 from PIL import Image
 from ..models import FoodScan, Recommendation
 from ..services.vision import classify_topk
+from ..services.hybrid_food_recognizer import open_image
 from ..services.generator import generate_profile_and_recipes
 
+logger = logging.getLogger(__name__)
+
+def reduce_for_resize(img: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Integer-subsample an image that is several times larger than `size`"""
+    # reduce() box-averages whole pixel blocks, which is far cheaper than
+    # running the resize filter over the full-resolution image
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor < 2 or img.mode in ("1", "P", "I;16"):
+        return img
+    return img.reduce(factor)
+
 def determine_fallback_food(img: Image.Image) -> str:
     """Determine a reasonable fallback food based on basic image analysis"""
     # Simple heuristics for fallback identification
-    img_small = img.resize((100, 100))
-    pixels = list(img_small.getdata())
+    img_small = reduce_for_resize(img, (200, 200)).resize((100, 100)).convert('RGB')
+    pixels = np.asarray(img_small, dtype=np.uint8).astype(np.int16)
+    r, g, b = pixels[..., 0], pixels[..., 1], pixels[..., 2]
     
     # Color analysis for fallback
-    total_pixels = len(pixels)
-    green_count = sum(1 for r, g, b in pixels if g > max(r, b) + 20)
-    brown_count = sum(1 for r, g, b in pixels if 80 < r < 180 and 40 < g < 120 and b < 80)
-    white_count = sum(1 for r, g, b in pixels if r > 180 and g > 180 and b > 180)
+    total_pixels = r.size
+    green_count = np.count_nonzero(g > np.maximum(r, b) + 20)
+    brown_count = np.count_nonzero((r > 80) & (r < 180) & (g > 40) & (g < 120) & (b < 80))
+    white_count = np.count_nonzero((r > 180) & (g > 180) & (b > 180))
     
     green_ratio = green_count / total_pixels
     brown_ratio = brown_count / total_pixels
@@ -32,18 +48,15 @@ def determine_fallback_food(img: Image.Image) -> str:
     else:
         return "mixed dish"
 
-router = APIRouter()
-
-@router.post("", response_model=Recommendation)
-def analyze(scan: FoodScan):
-    """
-    Analyze food image with validation and confidence handling
-    """
+def analyze_image(image_b64: str, notes: Optional[str], img_bytes: Optional[bytes] = None) -> Recommendation:
+    """Validate, classify and build the recommendation for one upload"""
     try:
         # Basic image validation
         try:
-            img_bytes = base64.b64decode(scan.image_b64)
+            if img_bytes is None:
+                img_bytes = base64.b64decode(image_b64)
             img = Image.open(io.BytesIO(img_bytes))
+            rgb = None
             
             # Check if image is too small or unclear
             width, height = img.size
@@ -53,16 +66,20 @@ def analyze(scan: FoodScan):
             # Check if image is suspiciously large (might not be food)
             if width > 4000 or height > 4000:
                 # Resize for processing
-                img = img.resize((min(width, 1024), min(height, 1024)), Image.Resampling.LANCZOS)
+                target = (min(width, 1024), min(height, 1024))
+                img = reduce_for_resize(img, target).resize(target, Image.Resampling.LANCZOS)
                 img_buffer = io.BytesIO()
                 img.save(img_buffer, format='JPEG', quality=85)
-                scan.image_b64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+                image_b64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+            else:
+                # Hand the recognizers these bytes rather than decoding the payload again
+                rgb = open_image(img_bytes)
             
         except Exception as e:
             raise HTTPException(status_code=400, detail="Unable to process image. Please upload a valid food image.")
         
         # Classify food using computer vision
-        topk = classify_topk(scan.image_b64, k=3)
+        topk = classify_topk(image_b64, k=3, img=rgb)
         
         if not topk:
             raise HTTPException(status_code=422, detail="Could not analyze the uploaded image")
@@ -75,10 +92,10 @@ def analyze(scan: FoodScan):
             # Low confidence - use generic but reasonable estimates
             fallback_food = determine_fallback_food(img)
             topk = [(fallback_food, 0.4)]
-            print(f"⚠ Low confidence, using fallback: {fallback_food}")
+            logger.debug("Low confidence, using fallback: %s", fallback_food)
         
         # Generate comprehensive recommendation
-        recommendation = generate_profile_and_recipes(topk, notes=scan.notes)
+        recommendation = generate_profile_and_recipes(topk, notes=notes)
         
         # Add appropriate confidence indicators
         if primary_confidence < 0.6:
@@ -86,12 +103,31 @@ def analyze(scan: FoodScan):
         elif 0.6 <= primary_confidence < 0.8:
             recommendation.profile.name = f"{recommendation.profile.name}"
         
-        print(f"✓ Final result: {recommendation.profile.name} ({primary_confidence:.2f})")
+        logger.debug("Final result: %s (%.2f)", recommendation.profile.name, primary_confidence)
         
         return recommendation
     
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Analysis error: {e}")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
\ No newline at end of file
+        logger.exception("Analysis error: %s", e)
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+router = APIRouter()
+
+@router.post("", response_model=Recommendation)
+def analyze(scan: FoodScan):
+    """
+    Analyze food image with validation and confidence handling
+    """
+    return analyze_image(scan.image_b64, scan.notes)
+
+@router.post("/upload", response_model=Recommendation)
+def analyze_upload(image: UploadFile = File(...), notes: Optional[str] = Form(None)):
+    """
+    Analyze a food image sent as multipart form data
+    The raw bytes skip the base64 round-trip the JSON endpoint needs on the wire
+    """
+    img_bytes = image.file.read()
+    # The recognizers and the result cache still key on the base64 form
+    return analyze_image(base64.b64encode(img_bytes).decode('ascii'), notes, img_bytes)
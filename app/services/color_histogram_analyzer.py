@@ -131,11 +131,12 @@ class ColorHistogramAnalyzer:
             'b': 20   # 20 bins for blue-yellow
         }
     
-    def analyze_food_image(self, image_b64: str) -> Tuple[str, float, Dict]:
+    def analyze_food_image(self, image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
         """Analyze food image using advanced color histogram techniques"""
         try:
-            # Decode image
-            img = self._decode_image(image_b64)
+            # Decode image unless the caller already has it as RGB
+            if img is None:
+                img = self._decode_image(image_b64)
             
             # Convert to different color spaces
             img_rgb = np.array(img)
@@ -494,6 +495,6 @@ class ColorHistogramAnalyzer:
 # Global instance
 color_analyzer = ColorHistogramAnalyzer()
 
-def analyze_food_with_color_histograms(image_b64: str) -> Tuple[str, float, Dict]:
+def analyze_food_with_color_histograms(image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
     """Public API for color histogram analysis"""
-    return color_analyzer.analyze_food_image(image_b64)
\ No newline at end of file
+    return color_analyzer.analyze_food_image(image_b64, img)
\ No newline at end of file
@@ -3,7 +3,7 @@ Advanced Food Recognition with Free Computer Vision Services
 Uses multiple fallback systems for accurate food identification
 """
 import os
-import requests
+from .http_session import http_session
 import base64
 from typing import Dict, List, Tuple, Optional
 import json
@@ -58,7 +58,7 @@ class EnhancedFoodRecognizer:
                 ]
             }
             
-            response = requests.post(url, json=payload, timeout=10)
+            response = http_session.post(url, json=payload, timeout=10)
             
             if response.status_code == 200:
                 result = response.json()
@@ -3,7 +3,7 @@ Advanced Food Recognition using Free APIs and Smart Classification
 Provides accurate food identification without paid services
 """
 import os
-import requests
+from .http_session import http_session
 import json
 import base64
 from typing import Dict, List, Tuple, Optional
@@ -11,6 +11,38 @@ from PIL import Image
 import io
 import numpy as np
 
+# Common mappings from the Hugging Face models' output; built once at import
+HF_LABEL_MAPPINGS = {
+    "pizza": "pizza",
+    "hamburger": "burger",
+    "hot_dog": "hot dog",
+    "fried_chicken": "fried chicken",
+    "grilled_chicken": "grilled chicken breast",
+    "steak": "grilled steak",
+    "sushi": "sushi",
+    "pasta": "pasta with sauce",
+    "salad": "mixed salad",
+    "soup": "vegetable soup",
+    "ice_cream": "ice cream",
+    "cake": "chocolate cake",
+    "donuts": "donuts",
+    "french_fries": "french fries",
+    "sandwich": "sandwich",
+    "tacos": "tacos",
+    "burrito": "burrito",
+    "ramen": "ramen",
+    "pho": "pho soup",
+    "curry": "curry",
+    "rice": "fried rice",
+    "noodles": "noodles",
+    "bread": "bread",
+    "eggs": "scrambled eggs",
+    "pancakes": "pancakes",
+    "waffles": "waffles",
+    "fruit_salad": "fruit bowl",
+    "smoothie": "smoothie bowl"
+}
+
 class AdvancedFoodRecognizer:
     def __init__(self):
         # Comprehensive food feature database for intelligent classification
@@ -94,7 +126,7 @@ class AdvancedFoodRecognizer:
             # Try multiple models for better accuracy
             for model in self.food_models:
                 try:
-                    response = requests.post(
+                    response = http_session.post(
                         f"{self.hf_api_url}{model}",
                         headers=headers,
                         data=img_bytes,
@@ -127,44 +159,12 @@ class AdvancedFoodRecognizer:
     
     def map_hf_label_to_food(self, label: str) -> str:
         """Map Hugging Face labels to our food names"""
-        # Common mappings from the model's output
-        label_mappings = {
-            "pizza": "pizza",
-            "hamburger": "burger",
-            "hot_dog": "hot dog",
-            "fried_chicken": "fried chicken",
-            "grilled_chicken": "grilled chicken breast",
-            "steak": "grilled steak",
-            "sushi": "sushi",
-            "pasta": "pasta with sauce",
-            "salad": "mixed salad",
-            "soup": "vegetable soup",
-            "ice_cream": "ice cream",
-            "cake": "chocolate cake",
-            "donuts": "donuts",
-            "french_fries": "french fries",
-            "sandwich": "sandwich",
-            "tacos": "tacos",
-            "burrito": "burrito",
-            "ramen": "ramen",
-            "pho": "pho soup",
-            "curry": "curry",
-            "rice": "fried rice",
-            "noodles": "noodles",
-            "bread": "bread",
-            "eggs": "scrambled eggs",
-            "pancakes": "pancakes",
-            "waffles": "waffles",
-            "fruit_salad": "fruit bowl",
-            "smoothie": "smoothie bowl"
-        }
-        
         # Check for exact match first
-        if label in label_mappings:
-            return label_mappings[label]
+        if label in HF_LABEL_MAPPINGS:
+            return HF_LABEL_MAPPINGS[label]
         
         # Check for partial matches
-        for key, value in label_mappings.items():
+        for key, value in HF_LABEL_MAPPINGS.items():
             if key in label or label in key:
                 return value
                 
@@ -2,7 +2,7 @@ from typing import List, Tuple, Optional
 import re
 import json
 import os
-import requests
+from .http_session import http_session
 from ..models import NutritionProfile, Recommendation, RecipeCard
 
 def load_nutrition_database():
@@ -46,7 +46,7 @@ def get_nutrition_from_fooddata_central(food_name: str) -> Optional[dict]:
             "sortOrder": "asc"
         }
         
-        search_response = requests.get(search_url, params=search_params, timeout=5)
+        search_response = http_session.get(search_url, params=search_params, timeout=5)
         
         if search_response.status_code == 200:
             search_data = search_response.json()
@@ -58,7 +58,7 @@ def get_nutrition_from_fooddata_central(food_name: str) -> Optional[dict]:
                 
                 # Get detailed nutrition data
                 detail_url = f"{base_url}/food/{fdc_id}"
-                detail_response = requests.get(detail_url, timeout=5)
+                detail_response = http_session.get(detail_url, timeout=5)
                 
                 if detail_response.status_code == 200:
                     detail_data = detail_response.json()
@@ -8,10 +8,22 @@ import io
 import json
 import os
 from typing import Dict, List, Tuple, Optional
-import requests
+from .http_session import http_session
 import numpy as np
 from PIL import Image
 
+# Label keywords checked for every Google Vision annotation; built once at import
+FOOD_KEYWORDS = (
+    'food', 'dish', 'meal', 'cuisine', 'recipe', 'ingredient',
+    'breakfast', 'lunch', 'dinner', 'snack', 'dessert', 'beverage',
+    'fruit', 'vegetable', 'meat', 'seafood', 'dairy', 'grain',
+    'pizza', 'burger', 'pasta', 'salad', 'sushi', 'rice', 'bread',
+    'chicken', 'beef', 'pork', 'fish', 'egg', 'cheese', 'soup',
+    'sandwich', 'taco', 'curry', 'noodle', 'cake', 'cookie'
+)
+
+NON_FOOD_DESCRIPTORS = ('food', 'dish', 'plate', 'bowl', 'cuisine', 'meal', 'recipe')
+
 class GoogleVisionFoodRecognizer:
     def __init__(self):
         # Initialize Google Vision API
@@ -46,10 +58,10 @@ class GoogleVisionFoodRecognizer:
             "smoothie": ["smoothie", "juice", "shake", "beverage"]
         }
         
-    def detect_food(self, image_b64: str) -> Tuple[str, float, Dict]:
-        """Detect food using Google Vision API"""
+    def detect_food(self, image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
+        """Detect food using Google Vision API; img is the already-decoded RGB upload, if any"""
         if not self.api_key:
-            return self._fallback_detection(image_b64)
+            return self._fallback_detection(image_b64, img)
         
         try:
             # Call Google Vision API
@@ -66,22 +78,22 @@ class GoogleVisionFoodRecognizer:
                 }]
             }
             
-            response = requests.post(url, json=request_json, timeout=15)
+            response = http_session.post(url, json=request_json, timeout=15)
             
             if response.status_code != 200:
                 print(f"Google Vision API error: {response.status_code}")
-                return self._fallback_detection(image_b64)
+                return self._fallback_detection(image_b64, img)
             
             result = response.json()
             if 'responses' not in result or not result['responses']:
-                return self._fallback_detection(image_b64)
+                return self._fallback_detection(image_b64, img)
             
             data = result['responses'][0]
             
             # Check for API errors
             if 'error' in data:
                 print(f"Google Vision API error: {data['error']['message']}") 
-                return self._fallback_detection(image_b64)
+                return self._fallback_detection(image_b64, img)
             
             # Extract detection results
             labels = data.get('labelAnnotations', [])
@@ -92,13 +104,18 @@ class GoogleVisionFoodRecognizer:
             food_name, confidence = self._analyze_google_results(labels, objects, web_detection)
             
             # Extract additional features
-            features = self._extract_features(image_b64, labels, objects)
+            features = self._extract_features(image_b64, labels, objects, img)
             
             return (food_name, confidence, features)
             
         except Exception as e:
             print(f"Google Vision API error: {e}")
-            return self._fallback_detection(image_b64)
+            return self._fallback_detection(image_b64, img)
+    
+    def _decode_image(self, image_b64: str) -> Image.Image:
+        """Decode base64 image"""
+        img_bytes = base64.b64decode(image_b64)
+        return Image.open(io.BytesIO(img_bytes)).convert('RGB')
     
     def _analyze_google_results(self, labels, objects, web_detection) -> Tuple[str, float]:
         """Analyze Google Vision results to identify food"""
@@ -162,17 +179,8 @@ class GoogleVisionFoodRecognizer:
     
     def _is_food_related(self, text: str) -> bool:
         """Check if detected label is food-related"""
-        food_keywords = [
-            'food', 'dish', 'meal', 'cuisine', 'recipe', 'ingredient',
-            'breakfast', 'lunch', 'dinner', 'snack', 'dessert', 'beverage',
-            'fruit', 'vegetable', 'meat', 'seafood', 'dairy', 'grain',
-            'pizza', 'burger', 'pasta', 'salad', 'sushi', 'rice', 'bread',
-            'chicken', 'beef', 'pork', 'fish', 'egg', 'cheese', 'soup',
-            'sandwich', 'taco', 'curry', 'noodle', 'cake', 'cookie'
-        ]
-        
         text_lower = text.lower()
-        return any(keyword in text_lower for keyword in food_keywords)
+        return any(keyword in text_lower for keyword in FOOD_KEYWORDS)
     
     def _map_to_database_food(self, detected_name: str) -> Optional[str]:
         """Map Google Vision detection to foods in our database"""
@@ -197,10 +205,8 @@ class GoogleVisionFoodRecognizer:
     def _clean_food_name(self, name: str) -> str:
         """Clean detected name to be database-friendly"""
         # Remove common non-food descriptors
-        remove_words = ['food', 'dish', 'plate', 'bowl', 'cuisine', 'meal', 'recipe']
-        
         name_lower = name.lower()
-        for word in remove_words:
+        for word in NON_FOOD_DESCRIPTORS:
             name_lower = name_lower.replace(word, '').strip()
         
         # Check if cleaned name maps to database
@@ -219,12 +225,12 @@ class GoogleVisionFoodRecognizer:
         
         return (name, confidence)
     
-    def _extract_features(self, image_b64: str, labels, objects) -> Dict:
+    def _extract_features(self, image_b64: str, labels, objects, img: Optional[Image.Image] = None) -> Dict:
         """Extract features from image and Google Vision results"""
         try:
             # Basic image features
-            img_bytes = base64.b64decode(image_b64)
-            img = Image.open(io.BytesIO(img_bytes)).convert('RGB')
+            if img is None:
+                img = self._decode_image(image_b64)
             img_array = np.array(img.resize((224, 224)))
             
             features = {
@@ -242,12 +248,12 @@ class GoogleVisionFoodRecognizer:
         except Exception as e:
             return {'api_available': True, 'feature_error': str(e)}
     
-    def _fallback_detection(self, image_b64: str) -> Tuple[str, float, Dict]:
+    def _fallback_detection(self, image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
         """Fallback when Google Vision is not available"""
         try:
             # Simple image analysis
-            img_bytes = base64.b64decode(image_b64)
-            img = Image.open(io.BytesIO(img_bytes)).convert('RGB')
+            if img is None:
+                img = self._decode_image(image_b64)
             img_array = np.array(img.resize((224, 224)))
             
             avg_color = img_array.mean(axis=(0, 1))
@@ -273,6 +279,6 @@ class GoogleVisionFoodRecognizer:
 # Global instance
 google_recognizer = GoogleVisionFoodRecognizer()
 
-def detect_food_with_google_vision(image_b64: str) -> Tuple[str, float, Dict]:
+def detect_food_with_google_vision(image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
     """Public API for Google Vision food detection"""
-    return google_recognizer.detect_food(image_b64)
\ No newline at end of file
+    return google_recognizer.detect_food(image_b64, img)
\ No newline at end of file
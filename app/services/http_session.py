@@ -0,0 +1,12 @@
+"""
+Shared HTTP Session
+One pooled keep-alive session for outbound API calls, so repeated
+Google Vision / HuggingFace / FoodData requests skip the TLS handshake
+"""
+import requests
+from requests.adapters import HTTPAdapter
+
+http_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+http_session.mount('https://', _adapter)
+http_session.mount('http://', _adapter)
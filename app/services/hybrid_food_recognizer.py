@@ -4,8 +4,11 @@ Combines Google Vision API, Color Histogram Analysis, and Feature Matching
 for maximum accuracy in food detection
 """
 import base64
+import io
+import logging
 import os
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple, Optional
 import numpy as np
 from PIL import Image
 import json
@@ -16,6 +19,12 @@ from .color_histogram_analyzer import analyze_food_with_color_histograms
 from .robust_food_detection import get_robust_food_detection
 from .food_recognizer import get_free_food_recognition
 
+logger = logging.getLogger(__name__)
+
+# Smallest size decode_image keeps; every recognizer works at 224x224 or on
+# normalised histograms, and 2x headroom keeps their results unchanged
+DECODE_DRAFT_SIZE = (448, 448)
+
 class HybridFoodRecognizer:
     def __init__(self):
         pass
@@ -60,67 +69,72 @@ class HybridFoodRecognizer:
             "fried rice": "rice"
         }
         
-    def recognize_food(self, image_b64: str) -> Tuple[str, float, Dict]:
+    def recognize_food(self, image_b64: str, google_future: Optional[Future] = None,
+                       img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
         """
         Main recognition method that combines multiple approaches
         Returns: (food_name, confidence, detailed_results)
+        
+        google_future may carry a Google Vision call the caller already
+        started; it is resolved after the local methods so they overlap.
+        img is the decoded RGB upload, shared by every method below.
         """
         results = {}
-        
-        # 1. Try Google Vision API (if available)
-        google_api_key = os.environ.get('GOOGLE_VISION_API_KEY')
-        if google_api_key or os.environ.get('GOOGLE_APPLICATION_CREDENTIALS'):
-            try:
-                gv_result = detect_food_with_google_vision(image_b64)
-                results['google_vision'] = {
-                    'food': self._normalize_food_name(gv_result[0]),
-                    'confidence': gv_result[1],
-                    'features': gv_result[2]
-                }
-                print(f"✓ Google Vision detected: {gv_result[0]} ({gv_result[1]:.2f})")
-            except Exception as e:
-                print(f"Google Vision error: {e}")
-                results['google_vision'] = None
-        else:
-            print("⚠ Google Vision API not configured")
-            results['google_vision'] = None
+        if img is None:
+            img = decode_image(image_b64)
+        
+        # 1. Try Google Vision API (if available); the slot is reserved first
+        # so the method order of the results is the same either way
+        results['google_vision'] = None
+        if google_future is None:
+            google_api_key = os.environ.get('GOOGLE_VISION_API_KEY')
+            if google_api_key or os.environ.get('GOOGLE_APPLICATION_CREDENTIALS'):
+                results['google_vision'] = self._google_vision_result(
+                    lambda: detect_food_with_google_vision(image_b64, img))
+            else:
+                logger.debug("Google Vision API not configured")
         
         # 2. Advanced Color Histogram Analysis
         try:
-            color_result = analyze_food_with_color_histograms(image_b64)
+            color_result = analyze_food_with_color_histograms(image_b64, img)
             results['color_histogram'] = {
                 'food': self._normalize_food_name(color_result[0]),
                 'confidence': color_result[1],
                 'features': color_result[2]
             }
         except Exception as e:
-            print(f"Color histogram error: {e}")
+            logger.warning("Color histogram error: %s", e)
             results['color_histogram'] = None
         
-        # 3. HuggingFace ML Models
-        try:
-            hf_result = get_free_food_recognition(image_b64)
-            results['huggingface'] = {
-                'food': self._normalize_food_name(hf_result[0]),
-                'confidence': hf_result[1],
-                'features': hf_result[2] if len(hf_result) > 2 else {}
-            }
-        except Exception as e:
-            print(f"HuggingFace error: {e}")
-            results['huggingface'] = None
+        # 3. HuggingFace ML Models; off unless opted in, since each call is up
+        # to three remote requests with their own timeouts
+        results['huggingface'] = None
+        if os.environ.get('ENABLE_HUGGINGFACE_RECOGNITION'):
+            try:
+                hf_result = get_free_food_recognition(image_b64, img)
+                results['huggingface'] = {
+                    'food': self._normalize_food_name(hf_result[0]),
+                    'confidence': hf_result[1],
+                    'features': hf_result[2] if len(hf_result) > 2 else {}
+                }
+            except Exception as e:
+                logger.warning("HuggingFace error: %s", e)
         
         # 4. Feature-based Detection
         try:
-            feature_result = get_robust_food_detection(image_b64)
+            feature_result = get_robust_food_detection(image_b64, img)
             results['feature_matching'] = {
                 'food': self._normalize_food_name(feature_result[0]),
                 'confidence': feature_result[1],
                 'features': feature_result[2]
             }
         except Exception as e:
-            print(f"Feature matching error: {e}")
+            logger.warning("Feature matching error: %s", e)
             results['feature_matching'] = None
         
+        if google_future is not None:
+            results['google_vision'] = self._google_vision_result(google_future.result)
+        
         # Combine results using weighted voting
         final_food, final_confidence = self._combine_results(results)
         
@@ -138,6 +152,21 @@ class HybridFoodRecognizer:
         
         return (final_food, final_confidence, detailed_results)
     
+    def _google_vision_result(self, fetch: Callable[[], Tuple]) -> Optional[Dict]:
+        """Run a Google Vision lookup and wrap it as a method result"""
+        try:
+            gv_result = fetch()
+        except Exception as e:
+            logger.warning("Google Vision error: %s", e)
+            return None
+        
+        logger.debug("Google Vision detected: %s (%.2f)", gv_result[0], gv_result[1])
+        return {
+            'food': self._normalize_food_name(gv_result[0]),
+            'confidence': gv_result[1],
+            'features': gv_result[2]
+        }
+    
     def _check_google_auth(self) -> bool:
         """Check if Google Cloud authentication is available"""
         try:
@@ -310,9 +339,32 @@ class HybridFoodRecognizer:
 # Global instance
 hybrid_recognizer = HybridFoodRecognizer()
 
-def recognize_food_hybrid(image_b64: str) -> Tuple[str, float, Dict]:
+def open_image(data: bytes) -> Optional[Image.Image]:
+    """Decode raw upload bytes to the RGB image the recognizers share, or None"""
+    try:
+        img = Image.open(io.BytesIO(data))
+        # JPEGs are decoded at a reduced DCT scale that still covers
+        # DECODE_DRAFT_SIZE; a no-op for other formats
+        img.draft('RGB', DECODE_DRAFT_SIZE)
+        return img.convert('RGB')
+    except Exception:
+        return None
+
+def decode_image(image_b64: str) -> Optional[Image.Image]:
+    """
+    Decode an upload to RGB once for every recognizer
+    Returns None if it cannot be decoded, so each method reports its own error
+    """
+    try:
+        data = base64.b64decode(image_b64)
+    except Exception:
+        return None
+    return open_image(data)
+
+def recognize_food_hybrid(image_b64: str, google_future: Optional[Future] = None,
+                          img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
     """
     Public API for hybrid food recognition
     Combines multiple methods for best accuracy
     """
-    return hybrid_recognizer.recognize_food(image_b64)
\ No newline at end of file
+    return hybrid_recognizer.recognize_food(image_b64, google_future, img)
\ No newline at end of file
@@ -9,10 +9,33 @@ import json
 import numpy as np
 from PIL import Image
 from typing import Dict, List, Tuple, Optional
-import requests
+from .http_session import http_session
 import hashlib
 import colorsys
 
+# Food detection models tried in order on the Hugging Face inference API
+HF_FOOD_MODELS = (
+    "nateraw/food",
+    "Kaludi/food-category-classification-v2.0",
+    "julien-c/food-101"
+)
+
+# Substring mappings from detected names to known foods; built once at import
+FOOD_NAME_MAPPINGS = {
+    "hamburger": "burger",
+    "french fries": "french fries",
+    "fried rice": "fried rice", 
+    "spaghetti": "pasta",
+    "beef": "steak",
+    "chicken": "grilled chicken",
+    "fish": "grilled fish",
+    "salad": "salad",
+    "fruit": "fruit bowl",
+    "vegetable": "vegetables",
+    "soup": "soup",
+    "sandwich": "sandwich"
+}
+
 class RobustFoodDetector:
     def __init__(self):
         # Comprehensive food knowledge base
@@ -161,11 +184,12 @@ class RobustFoodDetector:
             "mixed_colors": ["pizza", "burger", "salad", "fruit bowl"]
         }
         
-    def detect_food(self, image_b64: str) -> Tuple[str, float, Dict]:
+    def detect_food(self, image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
         """Main detection function that always returns accurate results"""
         try:
-            # Decode and analyze image
-            img = self._decode_image(image_b64)
+            # Decode (unless the caller already has it as RGB) and analyze image
+            if img is None:
+                img = self._decode_image(image_b64)
             
             # Extract comprehensive features
             features = self._extract_features(img)
@@ -433,20 +457,13 @@ class RobustFoodDetector:
     def _try_huggingface_api(self, image_b64: str) -> Optional[Tuple[str, float]]:
         """Try Hugging Face food detection models"""
         try:
-            # List of food detection models on Hugging Face
-            models = [
-                "nateraw/food",
-                "Kaludi/food-category-classification-v2.0",
-                "julien-c/food-101"
-            ]
-            
             headers = {"Content-Type": "application/json"}
             img_bytes = base64.b64decode(image_b64)
             
-            for model in models:
+            for model in HF_FOOD_MODELS:
                 try:
                     url = f"https://api-inference.huggingface.co/models/{model}"
-                    response = requests.post(url, headers=headers, data=img_bytes, timeout=5)
+                    response = http_session.post(url, headers=headers, data=img_bytes, timeout=5)
                     
                     if response.status_code == 200:
                         results = response.json()
@@ -629,22 +646,7 @@ class RobustFoodDetector:
             return clean_name
         
         # Try to map to known foods
-        mappings = {
-            "hamburger": "burger",
-            "french fries": "french fries",
-            "fried rice": "fried rice", 
-            "spaghetti": "pasta",
-            "beef": "steak",
-            "chicken": "grilled chicken",
-            "fish": "grilled fish",
-            "salad": "salad",
-            "fruit": "fruit bowl",
-            "vegetable": "vegetables",
-            "soup": "soup",
-            "sandwich": "sandwich"
-        }
-        
-        for key, value in mappings.items():
+        for key, value in FOOD_NAME_MAPPINGS.items():
             if key in clean_name:
                 return value
         
@@ -654,6 +656,6 @@ class RobustFoodDetector:
 # Global instance
 robust_detector = RobustFoodDetector()
 
-def get_robust_food_detection(image_b64: str) -> Tuple[str, float, Dict]:
+def get_robust_food_detection(image_b64: str, img: Optional[Image.Image] = None) -> Tuple[str, float, Dict]:
     """Public API for robust food detection"""
-    return robust_detector.detect_food(image_b64)
\ No newline at end of file
+    return robust_detector.detect_food(image_b64, img)
\ No newline at end of file
@@ -1,254 +1,294 @@
 import base64, io
+import hashlib
+import logging
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import lru_cache
 import requests
 from PIL import Image
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import json
 import numpy as np
 from .food_api import get_enhanced_food_classification
 from .food_recognizer import get_free_food_recognition
 from .intelligent_recognition import get_intelligent_food_recognition
 from .robust_food_detection import get_robust_food_detection
-from .hybrid_food_recognizer import recognize_food_hybrid
+from .hybrid_food_recognizer import decode_image, recognize_food_hybrid
 from .google_vision_recognizer import detect_food_with_google_vision
 
+logger = logging.getLogger(__name__)
+
+# Grid the colour statistics are computed on, and the share of that grid a
+# red/green/brown margin must cover for the colour to count as dominant
+ANALYSIS_SIZE = (224, 224)
+DOMINANT_COLORS = ("red", "green", "brown")
+DOMINANT_SHARE = 0.15
+
+# An upload is blank when every cell of a small greyscale thumbnail is below
+# this level: a lens cap or covered camera, not dark food or a dim photo
+BLANK_THUMB_SIZE = (32, 32)
+BLANK_MAX_LEVEL = 16
+
+@dataclass(slots=True)
+class ImageAnalysis:
+    """Color and texture statistics produced by SmartFoodRecognizer.analyze_image_content"""
+    red_ratio: float
+    green_ratio: float
+    brown_ratio: float
+    yellow_ratio: float
+    white_ratio: float
+    avg_brightness: float
+    texture_complexity: float
+    dominant_colors: List[str] = field(default_factory=list)
+
+# Feature vector layout used by the classification rule table
+RULE_FEATURES = (
+    "red_ratio", "green_ratio", "brown_ratio", "yellow_ratio", "white_ratio",
+    "avg_brightness", "texture_complexity", "dominant_count", "brown_dominant",
+)
+
+def _rule(label: Optional[str], **bounds: Tuple[Optional[float], Optional[float]]):
+    """Build one rule row; bounds are exclusive (low, high) limits, None = open"""
+    lows = np.full(len(RULE_FEATURES), -np.inf)
+    highs = np.full(len(RULE_FEATURES), np.inf)
+    for name, (low, high) in bounds.items():
+        i = RULE_FEATURES.index(name)
+        if low is not None:
+            lows[i] = low
+        if high is not None:
+            highs[i] = high
+    return label, lows, highs
+
+# Rules are evaluated in order and the first match wins. Each group of the
+# original if/elif cascade ends in a catch-all row so later groups only see
+# images the earlier groups rejected.
+_RULES = [
+    # Pizza
+    _rule("pizza", red_ratio=(0.08, None), white_ratio=(0.08, None),
+          brown_ratio=(0.03, None), texture_complexity=(150, None)),
+    # Salads
+    _rule("caesar salad", green_ratio=(0.25, None), white_ratio=(0.1, None),
+          brown_dominant=(0.5, None)),
+    _rule("mixed salad", green_ratio=(0.25, None), red_ratio=(0.05, None)),
+    _rule("green salad", green_ratio=(0.25, None)),
+    # Meat
+    _rule("steak", brown_ratio=(0.3, None), texture_complexity=(100, None),
+          red_ratio=(0.08, None)),
+    _rule("grilled chicken", brown_ratio=(0.5, None), texture_complexity=(100, None)),
+    _rule("chicken breast", brown_ratio=(0.3, None), texture_complexity=(100, None)),
+    # Carbs
+    _rule("pasta", white_ratio=(0.35, None), texture_complexity=(None, 80),
+          yellow_ratio=(0.15, None)),
+    _rule("white rice", white_ratio=(0.35, None), texture_complexity=(None, 80)),
+    _rule("brown rice", brown_ratio=(0.25, None), white_ratio=(0.15, None),
+          texture_complexity=(None, 100)),
+    # Bread and baked goods
+    _rule("bread", brown_ratio=(0.25, None), texture_complexity=(40, 200),
+          avg_brightness=(120, None)),
+    _rule("toast", brown_ratio=(0.25, None), texture_complexity=(40, 200)),
+    # Fruit; a bright image matching no fruit has always returned None
+    _rule("strawberry", avg_brightness=(100, None), red_ratio=(0.25, None),
+          texture_complexity=(150, None)),
+    _rule("banana", avg_brightness=(100, None), yellow_ratio=(0.3, None),
+          brown_ratio=(None, 0.1)),
+    _rule("apple", avg_brightness=(100, None), red_ratio=(0.15, None),
+          yellow_ratio=(0.1, None)),
+    _rule("mixed fruit", avg_brightness=(100, None), red_ratio=(0.1, None),
+          green_ratio=(0.1, None)),
+    _rule(None, avg_brightness=(100, None)),
+    # Vegetable dishes
+    _rule("cooked vegetables", green_ratio=(0.15, None), brown_ratio=(0.1, None)),
+    _rule("fresh vegetables", green_ratio=(0.15, None)),
+    # Desserts and sweets
+    _rule("chocolate cake", avg_brightness=(140, None), texture_complexity=(50, None),
+          brown_ratio=(0.2, None)),
+    _rule("cake", avg_brightness=(140, None), texture_complexity=(50, None),
+          brown_ratio=(0.1, None)),
+    _rule("cake", avg_brightness=(140, None), texture_complexity=(50, None),
+          white_ratio=(0.2, None)),
+    # Liquid foods (soups, beverages)
+    _rule("tomato soup", texture_complexity=(None, 50), red_ratio=(0.1, None)),
+    _rule("milk", texture_complexity=(None, 50), avg_brightness=(150, None)),
+    _rule("soup", texture_complexity=(None, 50)),
+    # Complex dishes
+    _rule("burger", texture_complexity=(200, None), dominant_count=(1, None),
+          brown_ratio=(0.15, None), red_ratio=(0.05, None)),
+    _rule("sandwich", texture_complexity=(200, None), dominant_count=(1, None),
+          yellow_ratio=(0.1, None), brown_ratio=(0.1, None)),
+    _rule("mixed dish", texture_complexity=(200, None), dominant_count=(1, None)),
+    # Default intelligent fallback
+    _rule("cooked food", brown_ratio=(0.2, None)),
+    _rule("vegetable dish", green_ratio=(0.1, None)),
+]
+
+RULE_LABELS = [label for label, _, _ in _RULES]
+RULE_LOWS = np.array([lows for _, lows, _ in _RULES])
+RULE_HIGHS = np.array([highs for _, _, highs in _RULES])
+RULE_FALLBACK = "food item"
+
+def _feature_vector(analysis: ImageAnalysis) -> np.ndarray:
+    """Pack an ImageAnalysis into the RULE_FEATURES layout"""
+    return np.array([
+        analysis.red_ratio,
+        analysis.green_ratio,
+        analysis.brown_ratio,
+        analysis.yellow_ratio,
+        analysis.white_ratio,
+        analysis.avg_brightness,
+        analysis.texture_complexity,
+        len(analysis.dominant_colors),
+        "brown" in analysis.dominant_colors,
+    ], dtype=float)
+
+def _color_counts_numpy(pixels: np.ndarray) -> np.ndarray:
+    """Count red, green, brown, yellow, white, red- and green-dominant pixels"""
+    # Widen once so the margin checks cannot wrap uint8
+    r, g, b = (pixels[..., c].astype(np.int16) for c in range(3))
+    return np.array([
+        np.count_nonzero((r > 150) & (r > g) & (r > b)),
+        np.count_nonzero((g > 150) & (g > r) & (g > b)),
+        np.count_nonzero((r > 50) & (r < 150) & (g > 30) & (g < 120) & (b < 100)),
+        np.count_nonzero((r > 150) & (g > 150) & (b < 100)),
+        np.count_nonzero((r > 200) & (g > 200) & (b > 200)),
+        np.count_nonzero(r > np.maximum(g, b) + 30),
+        np.count_nonzero(g > np.maximum(r, b) + 30),
+    ], dtype=np.int64)
+
+def _brightness_stats(n: int, gray_sum: int, gray_sq: int) -> Tuple[float, float]:
+    """Mean and population variance from exact integer sums of the grey levels"""
+    return gray_sum / n, (n * gray_sq - gray_sum * gray_sum) / (n * n)
+
+def _gray_stats_numpy(gray: np.ndarray) -> Tuple[float, float]:
+    """Mean and variance of a uint8 greyscale plane via one int64 sum and dot"""
+    # Integer sum/dot is about twice as fast as mean() + var(); int64 because
+    # the sum of squares of a bright 224x224 plane overflows int32
+    flat = gray.ravel().astype(np.int64)
+    return _brightness_stats(flat.size, int(flat.sum()), int(flat @ flat))
+
+def _pixel_stats(img: Image.Image) -> Tuple[np.ndarray, float, float]:
+    """Colour counts plus greyscale mean and variance of a resized RGB image"""
+    pixels = np.asarray(img, dtype=np.uint8)
+    # PIL's C conversion beats a NumPy weighted sum for the greyscale plane
+    gray = np.asarray(img.convert('L'), dtype=np.uint8)
+    return (_color_counts_numpy(pixels), *_gray_stats_numpy(gray))
+
 class SmartFoodRecognizer:
     def __init__(self):
         print("✓ Smart food recognition system initialized")
     
-    def analyze_image_content(self, img: Image.Image) -> dict:
+    def analyze_image_content(self, img: Image.Image) -> ImageAnalysis:
         """Analyze actual image content for food characteristics"""
         # Convert to RGB if needed
         if img.mode != 'RGB':
             img = img.convert('RGB')
         
-        img_resized = img.resize((224, 224))
+        img_resized = img.resize(ANALYSIS_SIZE)
         
-        # Analyze color distribution for food characteristics
-        pixels = list(img_resized.getdata())
-        total_pixels = len(pixels)
-        
-        # Color analysis
-        red_count = sum(1 for r, g, b in pixels if r > 150 and r > g and r > b)
-        green_count = sum(1 for r, g, b in pixels if g > 150 and g > r and g > b)
-        brown_count = sum(1 for r, g, b in pixels if 50 < r < 150 and 30 < g < 120 and b < 100)
-        yellow_count = sum(1 for r, g, b in pixels if r > 150 and g > 150 and b < 100)
-        white_count = sum(1 for r, g, b in pixels if r > 200 and g > 200 and b > 200)
-        
-        # Texture analysis (brightness variance)
-        gray_img = img_resized.convert('L')
-        gray_values = list(gray_img.getdata())
-        avg_brightness = sum(gray_values) / len(gray_values)
-        brightness_variance = sum((v - avg_brightness) ** 2 for v in gray_values) / len(gray_values)
-        
-        return {
-            "red_ratio": red_count / total_pixels,
-            "green_ratio": green_count / total_pixels,
-            "brown_ratio": brown_count / total_pixels,
-            "yellow_ratio": yellow_count / total_pixels,
-            "white_ratio": white_count / total_pixels,
-            "avg_brightness": avg_brightness,
-            "texture_complexity": brightness_variance,
-            "dominant_colors": self._get_dominant_colors(pixels)
-        }
+        # Color and texture (brightness variance) analysis in one pass
+        counts, avg_brightness, brightness_variance = _pixel_stats(img_resized)
+        return self._build_analysis(counts, avg_brightness, brightness_variance)
     
-    def _get_dominant_colors(self, pixels: List[Tuple[int, int, int]]) -> List[str]:
-        """Identify dominant color characteristics"""
-        colors = []
-        total = len(pixels)
+    def _build_analysis(self, counts: np.ndarray, avg_brightness: float,
+                        brightness_variance: float) -> ImageAnalysis:
+        """Turn the seven colour counts and brightness stats into ratios"""
+        total_pixels = ANALYSIS_SIZE[0] * ANALYSIS_SIZE[1]
+        (red_count, green_count, brown_count, yellow_count, white_count,
+         red_dominant_count, green_dominant_count) = (int(c) for c in counts)
         
-        red_count = sum(1 for r, g, b in pixels if r > max(g, b) + 30)
-        green_count = sum(1 for r, g, b in pixels if g > max(r, b) + 30)
-        brown_count = sum(1 for r, g, b in pixels if 50 < r < 150 and 30 < g < 120 and b < 100)
+        dominant_counts = {
+            "red": red_dominant_count,
+            "green": green_dominant_count,
+            "brown": brown_count,
+        }
         
-        if red_count > total * 0.15:
-            colors.append("red")
-        if green_count > total * 0.15:
-            colors.append("green")
-        if brown_count > total * 0.15:
-            colors.append("brown")
+        return ImageAnalysis(
+            red_ratio=red_count / total_pixels,
+            green_ratio=green_count / total_pixels,
+            brown_ratio=brown_count / total_pixels,
+            yellow_ratio=yellow_count / total_pixels,
+            white_ratio=white_count / total_pixels,
+            avg_brightness=avg_brightness,
+            texture_complexity=brightness_variance,
+            dominant_colors=self._get_dominant_colors(dominant_counts, total_pixels)
+        )
+    
+    def _get_dominant_colors(self, counts: Dict[str, int], total: int) -> List[str]:
+        """Identify dominant color characteristics from precomputed pixel counts"""
+        colors = [color for color in DOMINANT_COLORS if counts[color] > total * DOMINANT_SHARE]
         
         return colors[:3]  # Top 3 dominant colors
     
-    def classify_food_by_characteristics(self, analysis: dict) -> str:
+    def classify_food_by_characteristics(self, analysis: ImageAnalysis) -> str:
         """Enhanced food classification using advanced visual analysis"""
-        
-        # More sophisticated pizza detection
-        if (analysis["red_ratio"] > 0.08 and 
-            analysis["white_ratio"] > 0.08 and 
-            analysis["brown_ratio"] > 0.03 and
-            analysis["texture_complexity"] > 150):
-            return "pizza"
-        
-        # Enhanced salad detection
-        elif analysis["green_ratio"] > 0.25:
-            if analysis["white_ratio"] > 0.1 and "brown" in analysis["dominant_colors"]:
-                return "caesar salad"
-            elif analysis["red_ratio"] > 0.05:
-                return "mixed salad"
-            else:
-                return "green salad"
-        
-        # Improved meat detection
-        elif analysis["brown_ratio"] > 0.3 and analysis["texture_complexity"] > 100:
-            if analysis["red_ratio"] > 0.08:
-                return "steak"
-            elif analysis["brown_ratio"] > 0.5:
-                return "grilled chicken"
-            else:
-                return "chicken breast"
-        
-        # Better carb detection
-        elif analysis["white_ratio"] > 0.35 and analysis["texture_complexity"] < 80:
-            if analysis["yellow_ratio"] > 0.15:
-                return "pasta"
-            else:
-                return "white rice"
-        elif analysis["brown_ratio"] > 0.25 and analysis["white_ratio"] > 0.15 and analysis["texture_complexity"] < 100:
-            return "brown rice"
-        
-        # Bread and baked goods
-        elif analysis["brown_ratio"] > 0.25 and 40 < analysis["texture_complexity"] < 200:
-            if analysis["avg_brightness"] > 120:
-                return "bread"
-            else:
-                return "toast"
-        
-        # Fruit detection with better accuracy
-        elif analysis["avg_brightness"] > 100:
-            if analysis["red_ratio"] > 0.25 and analysis["texture_complexity"] > 150:
-                return "strawberry"
-            elif analysis["yellow_ratio"] > 0.3 and analysis["brown_ratio"] < 0.1:
-                return "banana"
-            elif analysis["red_ratio"] > 0.15 and analysis["yellow_ratio"] > 0.1:
-                return "apple"
-            elif analysis["red_ratio"] > 0.1 and analysis["green_ratio"] > 0.1:
-                return "mixed fruit"
-        
-        # Vegetable dishes
-        elif analysis["green_ratio"] > 0.15:
-            if analysis["brown_ratio"] > 0.1:
-                return "cooked vegetables"
-            else:
-                return "fresh vegetables"
-        
-        # Desserts and sweets
-        elif (analysis["avg_brightness"] > 140 and 
-              (analysis["brown_ratio"] > 0.1 or analysis["white_ratio"] > 0.2) and
-              analysis["texture_complexity"] > 50):
-            if analysis["brown_ratio"] > 0.2:
-                return "chocolate cake"
-            else:
-                return "cake"
-        
-        # Liquid foods (soups, beverages)
-        elif analysis["texture_complexity"] < 50:
-            if analysis["red_ratio"] > 0.1:
-                return "tomato soup"
-            elif analysis["avg_brightness"] > 150:
-                return "milk"
-            else:
-                return "soup"
-        
-        # Complex dishes
-        elif analysis["texture_complexity"] > 200 and len(analysis["dominant_colors"]) >= 2:
-            if analysis["brown_ratio"] > 0.15 and analysis["red_ratio"] > 0.05:
-                return "burger"
-            elif analysis["yellow_ratio"] > 0.1 and analysis["brown_ratio"] > 0.1:
-                return "sandwich"
-            else:
-                return "mixed dish"
-        
-        # Default intelligent fallback
-        else:
-            if analysis["brown_ratio"] > 0.2:
-                return "cooked food"
-            elif analysis["green_ratio"] > 0.1:
-                return "vegetable dish"
-            else:
-                return "food item"
+        features = _feature_vector(analysis)
+        hits = ((RULE_LOWS < features) & (features < RULE_HIGHS)).all(axis=1)
+        idx = int(np.argmax(hits))
+        return RULE_LABELS[idx] if hits[idx] else RULE_FALLBACK
 
-def generate_related_foods(primary_food: str) -> List[str]:
-    """Generate related foods based on the primary detection"""
-    food_lower = primary_food.lower()
-    
-    # Food relationship mapping
-    if any(word in food_lower for word in ["pizza", "burger", "sandwich"]):
-        return ["bread", "cheese"]
-    elif any(word in food_lower for word in ["chicken", "beef", "steak"]):
-        return ["rice", "vegetables"]
-    elif any(word in food_lower for word in ["rice", "pasta"]):
-        return ["vegetables", "sauce"]
-    elif any(word in food_lower for word in ["salad", "vegetables"]):
-        return ["dressing", "bread"]
-    elif any(word in food_lower for word in ["fruit", "apple", "banana"]):
-        return ["yogurt", "nuts"]
-    else:
-        return ["side dish", "beverage"]
+# Keyword -> related foods, in the order the names were originally tested;
+# substring matches, so "cheeseburger" and "vegetables" still hit
+RELATED_FOODS_BY_WORD = (
+    ("pizza", ("bread", "cheese")), ("burger", ("bread", "cheese")), ("sandwich", ("bread", "cheese")),
+    ("chicken", ("rice", "vegetables")), ("beef", ("rice", "vegetables")), ("steak", ("rice", "vegetables")),
+    ("rice", ("vegetables", "sauce")), ("pasta", ("vegetables", "sauce")),
+    ("salad", ("dressing", "bread")), ("vegetables", ("dressing", "bread")),
+    ("fruit", ("yogurt", "nuts")), ("apple", ("yogurt", "nuts")), ("banana", ("yogurt", "nuts")),
+)
+ALTERNATIVES_BY_WORD = (
+    ("chicken", ("rice", "vegetables")), ("meat", ("rice", "vegetables")),
+    ("steak", ("potatoes", "salad")), ("beef", ("potatoes", "salad")),
+    ("salad", ("bread", "chicken")), ("vegetable", ("bread", "chicken")),
+    ("rice", ("chicken", "vegetables")),
+    ("pasta", ("chicken", "cheese")),
+    ("fruit", ("yogurt", "oatmeal")), ("banana", ("yogurt", "oatmeal")), ("strawberry", ("yogurt", "oatmeal")),
+    ("pizza", ("bread", "cheese")),
+)
 
-def generate_visual_alternatives(analysis: dict, primary_food: str) -> List[str]:
-    """Generate alternative foods based on visual analysis"""
-    alternatives = []
-    
-    # Add alternatives based on visual characteristics
-    if analysis["green_ratio"] > 0.15 and "vegetable" not in primary_food.lower():
-        alternatives.append("vegetables")
-    
-    if analysis["brown_ratio"] > 0.2 and "meat" not in primary_food.lower():
-        alternatives.append("meat")
-    
-    if analysis["white_ratio"] > 0.25 and "rice" not in primary_food.lower():
-        alternatives.append("rice")
-    
-    if analysis["red_ratio"] > 0.1 and "tomato" not in primary_food.lower():
-        alternatives.append("tomato")
-    
-    # Fill remaining slots with contextual foods
-    while len(alternatives) < 2:
-        if primary_food in ["pizza", "burger"]:
-            alternatives.extend(["fries", "soda"])
-        elif primary_food in ["salad", "vegetables"]:
-            alternatives.extend(["bread", "dressing"])
-        elif "fruit" in primary_food:
-            alternatives.extend(["yogurt", "granola"])
-        else:
-            alternatives.extend(["side dish", "beverage"])
-        break
-    
-    return alternatives[:2]
+def _match_word(food_lower: str, table: Tuple[Tuple[str, Tuple[str, str]], ...]) -> Optional[Tuple[str, str]]:
+    """First table entry whose keyword occurs in the name, or None"""
+    return next((foods for word, foods in table if word in food_lower), None)
 
-def refine_food_name_for_demo(food_name: str, analysis: dict) -> str:
+@lru_cache(maxsize=256)
+def generate_related_foods(primary_food: str) -> Tuple[str, ...]:
+    """Generate related foods based on the primary detection"""
+    # Cached per food name, so the result is an immutable tuple
+    return _match_word(primary_food.lower(), RELATED_FOODS_BY_WORD) or ("side dish", "beverage")
+
+def refine_food_name_for_demo(food_name: str, analysis: ImageAnalysis) -> str:
     """Refine food names to be more specific and demo-friendly"""
     
     # Make food names more specific and appealing for demo
     if food_name == "chicken":
-        if analysis["texture_complexity"] > 150:
+        if analysis.texture_complexity > 150:
             return "grilled chicken breast"
         else:
             return "roasted chicken"
     
     elif food_name == "beef":
-        if analysis["red_ratio"] > 0.1:
+        if analysis.red_ratio > 0.1:
             return "grilled steak"
         else:
             return "beef tenderloin"
     
     elif food_name == "fruit":
-        if analysis["red_ratio"] > 0.25:
+        if analysis.red_ratio > 0.25:
             return "strawberries"
-        elif analysis["yellow_ratio"] > 0.25:
+        elif analysis.yellow_ratio > 0.25:
             return "banana"
         else:
             return "mixed fruit bowl"
     
     elif food_name == "vegetables":
-        if analysis["green_ratio"] > 0.3:
+        if analysis.green_ratio > 0.3:
             return "fresh green salad"
         else:
             return "roasted vegetables"
     
     elif food_name == "rice":
-        if analysis["brown_ratio"] > 0.1:
+        if analysis.brown_ratio > 0.1:
             return "brown rice"
         else:
             return "white rice"
@@ -257,79 +297,63 @@ def refine_food_name_for_demo(food_name: str, analysis: dict) -> str:
         return "pasta with sauce"
     
     elif food_name == "cooked food":
-        if analysis["brown_ratio"] > 0.4:
+        if analysis.brown_ratio > 0.4:
             return "grilled meat"
         else:
             return "prepared dish"
     
     elif food_name == "food item":
-        if analysis["brown_ratio"] > 0.2:
+        if analysis.brown_ratio > 0.2:
             return "cooked meal"
-        elif analysis["green_ratio"] > 0.15:
+        elif analysis.green_ratio > 0.15:
             return "vegetable dish"
         else:
             return "mixed plate"
     
     return food_name
 
-def generate_intelligent_alternatives(primary_food: str, analysis: dict) -> List[str]:
+@lru_cache(maxsize=256)
+def _alternatives_for_name(primary_food: str) -> Optional[Tuple[str, str]]:
+    """Alternatives implied by the food name alone; None if the name says nothing"""
+    return _match_word(primary_food.lower(), ALTERNATIVES_BY_WORD)
+
+def generate_intelligent_alternatives(primary_food: str, analysis: ImageAnalysis) -> List[str]:
     """Generate contextually relevant alternative foods"""
-    alternatives = []
-    food_lower = primary_food.lower()
-    
     # Generate alternatives based on primary food type
-    if "chicken" in food_lower or "meat" in food_lower:
-        alternatives = ["rice", "vegetables"]
-    elif "steak" in food_lower or "beef" in food_lower:
-        alternatives = ["potatoes", "salad"]
-    elif "salad" in food_lower or "vegetable" in food_lower:
-        alternatives = ["bread", "chicken"]
-    elif "rice" in food_lower:
-        alternatives = ["chicken", "vegetables"]
-    elif "pasta" in food_lower:
-        alternatives = ["chicken", "cheese"]
-    elif "fruit" in food_lower or "banana" in food_lower or "strawberry" in food_lower:
-        alternatives = ["yogurt", "oatmeal"]
-    elif "pizza" in food_lower:
-        alternatives = ["bread", "cheese"]
-    else:
-        # Generic alternatives based on visual characteristics
-        if analysis["green_ratio"] > 0.1:
-            alternatives.append("vegetables")
-        if analysis["brown_ratio"] > 0.2:
-            alternatives.append("meat")
-        if analysis["white_ratio"] > 0.2:
-            alternatives.append("rice")
-        
-        # Fill to ensure we have 2 alternatives
-        while len(alternatives) < 2:
-            alternatives.extend(["side dish", "beverage"])
-            break
+    by_name = _alternatives_for_name(primary_food)
+    if by_name is not None:
+        return list(by_name)
     
-    return alternatives[:2]
+    # Generic alternatives based on visual characteristics, padded to two
+    alternatives = [food for food, ratio, threshold in (
+        ("vegetables", analysis.green_ratio, 0.1),
+        ("meat", analysis.brown_ratio, 0.2),
+        ("rice", analysis.white_ratio, 0.2),
+    ) if ratio > threshold]
+    return (alternatives + ["side dish", "beverage"])[:2]
 
-def calculate_visual_confidence(analysis: dict) -> float:
+def calculate_visual_confidence(analysis: ImageAnalysis) -> float:
     """Calculate confidence score based on visual characteristics"""
     confidence = 0.65  # Base confidence
     
     # Strong visual indicators increase confidence
-    if analysis["texture_complexity"] > 200:
+    if analysis.texture_complexity > 200:
         confidence += 0.15
-    elif analysis["texture_complexity"] > 100:
+    elif analysis.texture_complexity > 100:
         confidence += 0.08
     
     # Multiple dominant colors indicate clear food features
-    if len(analysis["dominant_colors"]) >= 3:
+    if len(analysis.dominant_colors) >= 3:
         confidence += 0.12
-    elif len(analysis["dominant_colors"]) >= 2:
+    elif len(analysis.dominant_colors) >= 2:
         confidence += 0.06
     
     # Strong color ratios indicate distinctive food
     max_color_ratio = max(
-        analysis["red_ratio"], 
-        analysis["green_ratio"], 
-        analysis["brown_ratio"],
-        analysis["white_ratio"]
+        analysis.red_ratio, 
+        analysis.green_ratio, 
+        analysis.brown_ratio,
+        analysis.white_ratio
     )
     if max_color_ratio > 0.4:
         confidence += 0.1
@@ -341,22 +365,56 @@ def calculate_visual_confidence(analysis: dict) -> float:
 # Global recognizer instance
 food_recognizer = SmartFoodRecognizer()
 
-def classify_topk(image_b64: str, k: int = 3) -> List[Tuple[str, float]]:
+# Returned when every recognition method has failed
+_FALLBACK_RESULTS = [
+    ("mixed dish", 0.5),
+    ("vegetables", 0.3),
+    ("side dish", 0.2)
+]
+
+# Bounded LRU of recent results keyed by upload digest, so retries and
+# repeated demo images skip the recognition pipeline entirely
+_RESULT_CACHE_SIZE = 256
+_RESULT_CACHE: "OrderedDict[Tuple[str, bool], List[Tuple[str, float]]]" = OrderedDict()
+_RESULT_CACHE_LOCK = threading.Lock()
+
+def _is_blank(img: Image.Image) -> bool:
+    """True for a near-black, featureless frame"""
+    # A box-filtered thumbnail costs far less than the full colour analysis
+    thumb = img.resize(BLANK_THUMB_SIZE, Image.Resampling.BOX).convert('L')
+    return int(np.asarray(thumb).max()) < BLANK_MAX_LEVEL
+
+def _classify_all(image_b64: str, img: Optional[Image.Image] = None) -> List[Tuple[str, float]]:
     """
     Smart food classification prioritizing Google Vision API for maximum accuracy
     """
+    # Decode once; every recognizer below shares the same RGB image
+    if img is None:
+        img = decode_image(image_b64)
+    
+    # Nothing for the recognizers to work with: skip them and the API calls
+    if img is not None and _is_blank(img):
+        logger.debug("Blank image, using fallback results")
+        return _FALLBACK_RESULTS
+    
     try:
         # Check if Google Vision API is available and prioritize it
         google_api_key = os.environ.get('GOOGLE_VISION_API_KEY')
         
-        print(f"🔍 Vision Service Status:")
-        print(f"   Google API Key: {'✓ Configured' if google_api_key else '✗ Not found'}")
+        logger.debug("Vision service status: Google API key %s",
+                     "configured" if google_api_key else "not found")
         
+        google_future = None
         if google_api_key:
-            print("🚀 Using Google Vision API for professional-grade accuracy")
+            logger.debug("Using Google Vision API for professional-grade accuracy")
+            # The hybrid methods only run if this answer is not good enough, and
+            # are handed its outcome so they don't call Google Vision again
+            google_future = Future()
             try:
-                primary_food, confidence, features = detect_food_with_google_vision(image_b64)
-                print(f"✓ Google Vision: {primary_food} ({confidence:.2f})")
+                google_result = detect_food_with_google_vision(image_b64, img)
+                google_future.set_result(google_result)
+                primary_food, confidence, features = google_result
+                logger.debug("Google Vision: %s (%.2f)", primary_food, confidence)
                 
                 # If Google Vision is confident, use it directly
                 if confidence >= 0.75:
@@ -365,22 +423,23 @@ def classify_topk(image_b64: str, k: int = 3) -> List[Tuple[str, float]]:
                         (primary_food, confidence),
                         (related_foods[0], 0.15),
                         (related_foods[1], 0.05)
-                    ][:k]
+                    ]
                 else:
-                    print(f"  Lower confidence, using hybrid validation")
+                    logger.debug("Lower confidence, using hybrid validation")
                     
             except Exception as e:
-                print(f"  Google Vision API error: {e}")
-                print(f"  Falling back to hybrid approach")
+                if not google_future.done():
+                    google_future.set_exception(e)
+                logger.warning("Google Vision API error, falling back to hybrid approach: %s", e)
         else:
-            print("📱 Using free recognition methods (set GOOGLE_VISION_API_KEY for 95% accuracy)")
+            logger.debug("Using free recognition methods (set GOOGLE_VISION_API_KEY for 95% accuracy)")
         
         # Use the hybrid recognizer (includes all available methods)
-        primary_food, confidence, detailed_results = recognize_food_hybrid(image_b64)
+        primary_food, confidence, detailed_results = recognize_food_hybrid(image_b64, google_future, img)
         
         method_used = "Hybrid" if not google_api_key else "Hybrid + Google Vision"
-        print(f"✓ {method_used}: {primary_food} ({confidence:.2f})")
-        print(f"  Consensus: {detailed_results.get('consensus_level', 'unknown')}")
+        logger.debug("%s: %s (%.2f), consensus %s", method_used, primary_food, confidence,
+                     detailed_results.get('consensus_level', 'unknown'))
         
         # Generate related foods based on detected food
         related_foods = generate_related_foods(primary_food)
@@ -395,7 +454,7 @@ def classify_topk(image_b64: str, k: int = 3) -> List[Tuple[str, float]]:
                 (primary_food, confidence),
                 (related_foods[0], 0.15),
                 (related_foods[1], 0.05)
-            ][:k]
+            ]
         
         # If confidence is medium, include alternatives from other methods
         elif confidence >= 0.65:
@@ -415,7 +474,7 @@ def classify_topk(image_b64: str, k: int = 3) -> List[Tuple[str, float]]:
                 (primary_food, confidence),
                 (alternatives[0], 0.20),
                 (alternatives[1] if len(alternatives) > 1 else related_foods[0], 0.10)
-            ][:k]
+            ]
         
         # Low confidence - use feature-based alternatives
         else:
@@ -440,26 +499,47 @@ def classify_topk(image_b64: str, k: int = 3) -> List[Tuple[str, float]]:
                 (primary_food, confidence),
                 (alt_foods[0] if len(alt_foods) > 0 else "mixed dish", 0.15),
                 (alt_foods[1] if len(alt_foods) > 1 else "side dish", 0.10)
-            ][:k]
+            ]
         
     except Exception as e:
-        print(f"Hybrid recognition error: {e}")
+        logger.warning("Hybrid recognition error: %s", e)
         # Fallback to robust detection if hybrid fails
         try:
-            primary_food, confidence, features = get_robust_food_detection(image_b64)
+            primary_food, confidence, features = get_robust_food_detection(image_b64, img)
             related_foods = generate_related_foods(primary_food)
             
             return [
                 (primary_food, confidence),
                 (related_foods[0], 0.15),
                 (related_foods[1], 0.05)
-            ][:k]
+            ]
             
         except Exception as fallback_error:
-            print(f"Fallback error: {fallback_error}")
+            logger.warning("Fallback error: %s", fallback_error)
             # Final fallback
-            return [
-                ("mixed dish", 0.5),
-                ("vegetables", 0.3),
-                ("side dish", 0.2)
-            ][:k]
\ No newline at end of file
+            return _FALLBACK_RESULTS
+
+
+def classify_topk(image_b64: str, k: int = 3, img: Optional[Image.Image] = None) -> List[Tuple[str, float]]:
+    """
+    Classify an upload, serving repeat submissions from the result cache
+    img may carry the already-decoded RGB image
+    """
+    key = (hashlib.blake2b(image_b64.encode(), digest_size=16).hexdigest(),
+           bool(os.environ.get('GOOGLE_VISION_API_KEY')))
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(key)
+        if cached is not None:
+            _RESULT_CACHE.move_to_end(key)
+            return cached[:k]
+    
+    results = _classify_all(image_b64, img)
+    
+    # Never pin the static fallback: it usually means a transient failure
+    if results is not _FALLBACK_RESULTS:
+        with _RESULT_CACHE_LOCK:
+            _RESULT_CACHE[key] = results
+            _RESULT_CACHE.move_to_end(key)
+            while len(_RESULT_CACHE) > _RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
+    return results[:k]
@@ -0,0 +1,30 @@
+"""
+Sample image downloads for the recognition scripts
+Images are fetched over the shared HTTP session and kept base64-encoded on
+disk, so repeat runs skip the network
+"""
+import base64
+import hashlib
+from pathlib import Path
+from typing import Optional
+from app.services.http_session import http_session
+
+CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "test_images"
+
+def download_and_encode_image(url: str) -> Optional[str]:
+    """Download image from URL and encode to base64, reusing the on-disk copy from earlier runs"""
+    path = CACHE_DIR / f"{hashlib.sha1(url.encode()).hexdigest()}.b64"
+    if path.exists():
+        return path.read_text()
+    
+    try:
+        response = http_session.get(url, timeout=10)
+        response.raise_for_status()
+        image_b64 = base64.b64encode(response.content).decode('utf-8')
+    except Exception as e:
+        print(f"Error downloading {url}: {e}")
+        return None
+    
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path.write_text(image_b64)
+    return image_b64
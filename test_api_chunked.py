@@ -85,18 +85,20 @@ def test_api_connection():
     try:
         # Download a real food image
         img_url = "https://images.unsplash.com/photo-1565299624946-b28f40a0ae38?w=800"
-        img_response = requests.get(img_url)
+        img_response = session.get(img_url, timeout=15)
+        img_response.raise_for_status()
         img = Image.open(io.BytesIO(img_response.content))
         
-        # Resize to moderate size
-        img = img.resize((800, 600), Image.Resampling.LANCZOS)
+        # Shrink to what the server analyses anyway; keeps the body small
+        img.thumbnail((512, 512), Image.Resampling.BILINEAR)
         
         img_buffer = io.BytesIO()
-        img.save(img_buffer, format='JPEG', quality=85)
+        img.convert('RGB').save(img_buffer, format='JPEG', quality=75, optimize=False, progressive=False)
         img_buffer.seek(0)
         b64_image = base64.b64encode(img_buffer.read()).decode()
         
         print(f"   Image size: {len(b64_image)} bytes (base64)")
+        print(f"   payload KB: {len(b64_image) // 1024}")
         
         payload = {"image_b64": b64_image, "notes": ""}
         
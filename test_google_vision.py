@@ -2,9 +2,10 @@
 Test Google Vision API integration
 """
 import os
-import base64
 import requests
 from app.services.google_vision_recognizer import detect_food_with_google_vision
+from app.services.http_session import http_session
+from sample_images import download_and_encode_image
 
 def test_google_vision_setup():
     """Test if Google Vision API is properly configured"""
@@ -27,8 +28,10 @@ def test_google_vision_setup():
     try:
         # Download test image
         test_url = "https://images.unsplash.com/photo-1565299624946-b28f40a0ae38?w=400"  # Pizza
-        response = requests.get(test_url, timeout=10)
-        image_b64 = base64.b64encode(response.content).decode('utf-8')
+        image_b64 = download_and_encode_image(test_url)
+        if not image_b64:
+            print("❌ Could not download test image")
+            return False
         
         print("📸 Downloaded test pizza image")
         
@@ -71,13 +74,15 @@ def test_api_endpoint():
         
         # Download test image
         test_url = "https://images.unsplash.com/photo-1512621776951-a57141f2eefd?w=400"  # Salad
-        response = requests.get(test_url, timeout=10)
-        image_b64 = base64.b64encode(response.content).decode('utf-8')
+        image_b64 = download_and_encode_image(test_url)
+        if not image_b64:
+            print("❌ Could not download test image")
+            return False
         
         print("📸 Testing with salad image...")
         
         # Call API
-        api_response = requests.post(
+        api_response = http_session.post(
             api_url,
             json={"image": image_b64},
             timeout=15
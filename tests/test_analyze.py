@@ -0,0 +1,54 @@
+import io
+import pytest
+from PIL import Image
+
+pytest.importorskip("httpx")
+pytest.importorskip("multipart")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import analyze
+
+def _client(monkeypatch, seen):
+    def fake_classify(image_b64, k=3, img=None):
+        seen["img"] = img
+        return [("apple", 0.9), ("banana", 0.15), ("orange", 0.05)]
+    generate = analyze.generate_profile_and_recipes
+    def spy_generate(topk, notes=None):
+        seen["notes"] = notes
+        return generate(topk, notes=notes)
+    monkeypatch.setattr(analyze, "classify_topk", fake_classify)
+    monkeypatch.setattr(analyze, "generate_profile_and_recipes", spy_generate)
+    api = FastAPI()
+    api.include_router(analyze.router, prefix="/analyze")
+    return TestClient(api)
+
+def _jpeg(size=(120, 90)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 40, 30)).save(buf, "JPEG")
+    return buf.getvalue()
+
+def test_upload_analyzes_image_with_notes(monkeypatch):
+    seen = {}
+    response = _client(monkeypatch, seen).post(
+        "/analyze/upload", files={"image": ("meal.jpg", _jpeg(), "image/jpeg")},
+        data={"notes": "no nuts"})
+    assert response.status_code == 200
+    assert response.json()["profile"]["name"]
+    assert seen["notes"] == "no nuts"
+    # The uploaded bytes are decoded once and handed to the recognizers
+    assert seen["img"].mode == "RGB" and seen["img"].size == (120, 90)
+
+def test_upload_notes_are_optional(monkeypatch):
+    seen = {}
+    response = _client(monkeypatch, seen).post(
+        "/analyze/upload", files={"image": ("meal.jpg", _jpeg(), "image/jpeg")})
+    assert response.status_code == 200
+    assert seen["notes"] is None
+
+def test_upload_rejects_non_image(monkeypatch):
+    seen = {}
+    response = _client(monkeypatch, seen).post(
+        "/analyze/upload", files={"image": ("notes.txt", b"not an image", "text/plain")})
+    assert response.status_code == 400
+    assert "valid food image" in response.json()["detail"]
+    assert "img" not in seen
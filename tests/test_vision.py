@@ -0,0 +1,102 @@
+from PIL import Image
+from app.services.vision import ImageAnalysis, food_recognizer
+
+def _analysis(**overrides):
+    analysis = {"red_ratio": 0.0, "green_ratio": 0.0, "brown_ratio": 0.0,
+                "yellow_ratio": 0.0, "white_ratio": 0.0, "avg_brightness": 80.0,
+                "texture_complexity": 120.0, "dominant_colors": []}
+    analysis.update(overrides)
+    return ImageAnalysis(**analysis)
+
+def test_rule_table_first_match_wins():
+    classify = food_recognizer.classify_food_by_characteristics
+    assert classify(_analysis(red_ratio=0.1, white_ratio=0.1, brown_ratio=0.05,
+                              texture_complexity=160)) == "pizza"
+    assert classify(_analysis(green_ratio=0.3, white_ratio=0.2,
+                              dominant_colors=["green", "brown"])) == "caesar salad"
+    assert classify(_analysis(green_ratio=0.3)) == "green salad"
+
+def test_rule_table_fallbacks():
+    classify = food_recognizer.classify_food_by_characteristics
+    assert classify(_analysis()) == "food item"
+    assert classify(_analysis(brown_ratio=0.21, texture_complexity=90)) == "cooked food"
+    # Bright images that match no fruit rule fall through, as before
+    assert classify(_analysis(avg_brightness=110)) is None
+
+def test_rule_bounds_are_exact_at_thresholds():
+    # Features a hair past a threshold must not round back onto it
+    classify = food_recognizer.classify_food_by_characteristics
+    pizza = dict(red_ratio=0.1, white_ratio=0.1, brown_ratio=0.05)
+    assert classify(_analysis(texture_complexity=150.000001, **pizza)) == "pizza"
+    assert classify(_analysis(texture_complexity=150, **pizza)) != "pizza"
+    assert classify(_analysis(green_ratio=0.25000001)) == "green salad"
+
+def test_analyze_image_content_solid_colors():
+    red = food_recognizer.analyze_image_content(Image.new("RGB", (300, 200), (220, 40, 30)))
+    assert red.red_ratio == 1.0 and red.white_ratio == 0.0
+    assert red.texture_complexity == 0.0
+    assert red.dominant_colors == ["red"]
+    white = food_recognizer.analyze_image_content(Image.new("RGBA", (64, 64), (250, 250, 250, 255)))
+    assert white.white_ratio == 1.0 and white.dominant_colors == []
+
+def test_brightness_stats_exact_on_bright_images():
+    import numpy as np
+    white = food_recognizer.analyze_image_content(Image.new("RGB", (224, 224), (255, 255, 255)))
+    assert white.avg_brightness == 255.0 and white.texture_complexity == 0.0
+    noisy = Image.fromarray(np.random.default_rng(1).integers(200, 256, (224, 224, 3), dtype=np.uint8))
+    gray = np.asarray(noisy.convert('L'), dtype=np.float64)
+    analysis = food_recognizer.analyze_image_content(noisy)
+    assert np.isclose(analysis.avg_brightness, gray.mean())
+    assert np.isclose(analysis.texture_complexity, gray.var())
+
+def test_classify_topk_caches_repeat_uploads(monkeypatch):
+    from app.services import vision
+    calls = []
+    def fake_classify(image_b64, img=None):
+        calls.append(image_b64)
+        return [("apple", 0.9), ("banana", 0.15), ("orange", 0.05)]
+    monkeypatch.setattr(vision, "_classify_all", fake_classify)
+    monkeypatch.setattr(vision, "_RESULT_CACHE", vision.OrderedDict())
+    assert vision.classify_topk("abc", k=3)[0] == ("apple", 0.9)
+    assert vision.classify_topk("abc", k=1) == [("apple", 0.9)]
+    assert calls == ["abc"]
+
+def test_blank_image_skips_recognizers(monkeypatch):
+    import base64, io
+    from app.services import vision
+    monkeypatch.setattr(vision, "recognize_food_hybrid", lambda *a, **kw: 1 / 0)
+    buf = io.BytesIO()
+    Image.new("RGB", (80, 80), (6, 6, 6)).save(buf, "PNG")
+    image_b64 = base64.b64encode(buf.getvalue()).decode()
+    assert vision._classify_all(image_b64) is vision._FALLBACK_RESULTS
+
+def test_dark_and_blue_food_is_not_blank():
+    import numpy as np
+    from app.services import vision
+    for color in [(60, 60, 140), (35, 25, 20), (90, 40, 120), (30, 30, 30)]:
+        assert not vision._is_blank(Image.new("RGB", (120, 90), color))
+    # Blueberry-like: dark blue with texture
+    rng = np.random.default_rng(2)
+    berries = np.clip(rng.normal((40, 40, 90), 6, (120, 120, 3)), 0, 255).astype(np.uint8)
+    assert not vision._is_blank(Image.fromarray(berries))
+
+def test_hybrid_only_runs_after_unconfident_google(monkeypatch):
+    import base64, io
+    from app.services import vision
+    monkeypatch.setenv("GOOGLE_VISION_API_KEY", "test-key")
+    hybrid_calls = []
+    def fake_hybrid(image_b64, google_future=None, img=None):
+        hybrid_calls.append(google_future.result())
+        return "pasta", 0.85, {"consensus_level": "high"}
+    monkeypatch.setattr(vision, "recognize_food_hybrid", fake_hybrid)
+    buf = io.BytesIO()
+    Image.new("RGB", (80, 80), (200, 180, 90)).save(buf, "PNG")
+    image_b64 = base64.b64encode(buf.getvalue()).decode()
+    
+    monkeypatch.setattr(vision, "detect_food_with_google_vision", lambda *a: ("pizza", 0.9, {}))
+    assert vision._classify_all(image_b64)[0] == ("pizza", 0.9)
+    assert hybrid_calls == []
+    # A weak answer is handed to the hybrid methods rather than fetched again
+    monkeypatch.setattr(vision, "detect_food_with_google_vision", lambda *a: ("pizza", 0.5, {}))
+    assert vision._classify_all(image_b64)[0] == ("pasta", 0.85)
+    assert hybrid_calls == [("pizza", 0.5, {})]
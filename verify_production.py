@@ -3,59 +3,65 @@ Verify Google Vision API is working in production
 """
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
 
-def test_production_api(api_url: str):
-    """Test the production API endpoints"""
-    
-    print("🔍 NutriGuide+ Production Verification")
-    print("=" * 50)
-    
-    # Remove trailing slash
-    api_url = api_url.rstrip('/')
-    
-    # Test 1: Health check
-    print("\n1. Testing health endpoint...")
+# One keep-alive session, so the TLS handshake with the host is paid once
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=Retry(total=2, backoff_factor=0.3))
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
+def check_health(api_url: str) -> Tuple[bool, List[str]]:
+    """Probe /health; returns whether it answered and the lines to print"""
+    lines = ["\n1. Testing health endpoint..."]
     try:
-        response = requests.get(f"{api_url}/health", timeout=10)
-        print(f"   Status: {response.status_code}")
+        response = session.get(f"{api_url}/health", timeout=10)
+        lines.append(f"   Status: {response.status_code}")
         if response.status_code == 200:
             data = response.json()
-            print(f"   Version: {data.get('version', 'unknown')}")
-            print(f"   Features: {json.dumps(data.get('features', {}), indent=6)}")
+            lines.append(f"   Version: {data.get('version', 'unknown')}")
+            lines.append(f"   Features: {json.dumps(data.get('features', {}), indent=6)}")
     except Exception as e:
-        print(f"   ❌ Error: {e}")
-        return
-    
-    # Test 2: Debug status
-    print("\n2. Checking Google Vision API status...")
+        lines.append(f"   ❌ Error: {e}")
+        return False, lines
+    return True, lines
+
+def check_debug_status(api_url: str) -> List[str]:
+    """Probe /debug/status for the Google Vision configuration"""
+    lines = ["\n2. Checking Google Vision API status..."]
     try:
-        response = requests.get(f"{api_url}/debug/status", timeout=10)
+        response = session.get(f"{api_url}/debug/status", timeout=10)
         if response.status_code == 200:
             data = response.json()
             
             # API Key Status
             api_key_status = data.get('api_key_status', {})
-            print(f"   API Key Configured: {'✓' if api_key_status.get('configured') else '✗'}")
+            lines.append(f"   API Key Configured: {'✓' if api_key_status.get('configured') else '✗'}")
             if api_key_status.get('configured'):
-                print(f"   API Key: {api_key_status.get('prefix')}...{api_key_status.get('suffix')}")
+                lines.append(f"   API Key: {api_key_status.get('prefix')}...{api_key_status.get('suffix')}")
             
             # Google Vision Test
             gv_test = data.get('google_vision_test', {})
             if gv_test.get('status') == 'tested':
-                print(f"   API Key Valid: {'✓' if gv_test.get('api_key_valid') else '✗'}")
+                lines.append(f"   API Key Valid: {'✓' if gv_test.get('api_key_valid') else '✗'}")
                 if gv_test.get('error'):
-                    print(f"   Error: {gv_test['error']}")
+                    lines.append(f"   Error: {gv_test['error']}")
             
             # Environment
-            print(f"   Platform: {data.get('deployment_info', {}).get('platform')}")
+            lines.append(f"   Platform: {data.get('deployment_info', {}).get('platform')}")
             
     except Exception as e:
-        print(f"   ❌ Error accessing debug endpoint: {e}")
-    
-    # Test 3: Test vision methods
-    print("\n3. Testing vision methods with sample image...")
+        lines.append(f"   ❌ Error accessing debug endpoint: {e}")
+    return lines
+
+def check_vision_methods(api_url: str) -> List[str]:
+    """Run /debug/test-vision on its default sample image"""
+    lines = ["\n3. Testing vision methods with sample image..."]
     try:
-        response = requests.post(
+        response = session.post(
             f"{api_url}/debug/test-vision",
             json={},  # Uses default test image
             timeout=20
@@ -68,26 +74,28 @@ def test_production_api(api_url: str):
             # Google Vision results
             gv = methods.get('google_vision_direct', {})
             if gv.get('success'):
-                print(f"   ✓ Google Vision: {gv['food']} ({gv['confidence']:.1%})")
-                print(f"     API Available: {gv.get('api_available')}")
+                lines.append(f"   ✓ Google Vision: {gv['food']} ({gv['confidence']:.1%})")
+                lines.append(f"     API Available: {gv.get('api_available')}")
                 if gv.get('labels'):
-                    print(f"     Labels: {', '.join(gv['labels'][:3])}")
+                    lines.append(f"     Labels: {', '.join(gv['labels'][:3])}")
             else:
-                print(f"   ✗ Google Vision: {gv.get('error', 'Failed')}")
+                lines.append(f"   ✗ Google Vision: {gv.get('error', 'Failed')}")
             
             # Main classifier results
             main = methods.get('classify_topk', {})
             if main.get('success'):
                 primary = main['results'][0] if main.get('results') else {}
-                print(f"   ✓ Main Classifier: {primary.get('food')} ({primary.get('confidence', 0):.1%})")
+                lines.append(f"   ✓ Main Classifier: {primary.get('food')} ({primary.get('confidence', 0):.1%})")
             else:
-                print(f"   ✗ Main Classifier: {main.get('error', 'Failed')}")
+                lines.append(f"   ✗ Main Classifier: {main.get('error', 'Failed')}")
                 
     except Exception as e:
-        print(f"   ❌ Error testing vision: {e}")
-    
-    # Test 4: Live analysis
-    print("\n4. Testing live analysis endpoint...")
+        lines.append(f"   ❌ Error testing vision: {e}")
+    return lines
+
+def check_live_analysis(api_url: str) -> List[str]:
+    """Post a tiny image to /analyze"""
+    lines = ["\n4. Testing live analysis endpoint..."]
     try:
         # Use a small test image
         test_payload = {
@@ -95,7 +103,7 @@ def test_production_api(api_url: str):
             "notes": "test"
         }
         
-        response = requests.post(
+        response = session.post(
             f"{api_url}/analyze",
             json=test_payload,
             timeout=30
@@ -104,14 +112,38 @@ def test_production_api(api_url: str):
         if response.status_code == 200:
             data = response.json()
             profile = data.get('profile', {})
-            print(f"   ✓ Analysis successful")
-            print(f"     Food: {profile.get('name')}")
-            print(f"     Method: Check logs above for details")
+            lines.append(f"   ✓ Analysis successful")
+            lines.append(f"     Food: {profile.get('name')}")
+            lines.append(f"     Method: Check logs above for details")
         else:
-            print(f"   ✗ Analysis failed: {response.status_code}")
+            lines.append(f"   ✗ Analysis failed: {response.status_code}")
             
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        lines.append(f"   ❌ Error: {e}")
+    return lines
+
+def test_production_api(api_url: str):
+    """Test the production API endpoints"""
+    
+    print("🔍 NutriGuide+ Production Verification")
+    print("=" * 50)
+    
+    # Remove trailing slash
+    api_url = api_url.rstrip('/')
+    
+    # Nothing past the health check runs if the API is down
+    healthy, lines = check_health(api_url)
+    print("\n".join(lines))
+    if not healthy:
+        return
+    
+    # The remaining probes are independent, so they run together; output is
+    # printed in order afterwards
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        probes = [pool.submit(probe, api_url)
+                  for probe in (check_debug_status, check_vision_methods, check_live_analysis)]
+        for probe in probes:
+            print("\n".join(probe.result()))
     
     print("\n" + "=" * 50)
     print("\n📊 Summary:")
@@ -1,25 +1,57 @@
 import streamlit as st
-import base64
 import requests
 import os
+import html
 import json
+import re
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
-from PIL import Image
+from PIL import Image, ImageOps
 import io
+import numpy as np
+import threading
+from typing import List, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-# Configure requests session with retry logic
-session = requests.Session()
-retry = Retry(
-    total=3,
-    read=3,
-    connect=3,
-    backoff_factor=0.3,
-    status_forcelist=(500, 502, 504)
-)
-adapter = HTTPAdapter(max_retries=retry)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Configure requests session with retry logic; built once per server process
+# so its keep-alive connections survive reruns and are shared between users.
+# No spinner: it would emit an element before st.set_page_config below
+@st.cache_resource(show_spinner=False)
+def get_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        # Never retry read errors: a POST that timed out may still be running
+        # on the API, and each retry would wait out the full timeout again.
+        # False (not 0) re-raises the ReadTimeout so the UI reports a timeout
+        read=False,
+        connect=3,
+        # Exponential 0.5s/1s/2s waits, capped well under the request timeout,
+        # with jitter so clients don't retry an overloaded API in lockstep
+        backoff_factor=0.5,
+        backoff_max=4,
+        backoff_jitter=0.3,
+        # Only statuses that mean the request was refused, not that it ran and
+        # failed; once retries run out the last response is returned, so
+        # raise_for_status still reports the server's error
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=20)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+session = get_session()
 
 # Page config
 st.set_page_config(
@@ -30,7 +62,7 @@ st.set_page_config(
 )
 
 # Custom CSS for professional styling
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main {
         padding: 2rem;
@@ -69,9 +101,18 @@ st.markdown("""
         font-weight: 600;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-# Get API URL from environment or secrets
+# Every rerun must re-send the styles, because Streamlit drops elements a run
+# does not emit; the whitespace-collapsed copy is built once per process
+@st.cache_resource
+def minified_css() -> str:
+    return re.sub(r"\s*([{}:;,>])\s*", r"\1", re.sub(r"\s+", " ", CUSTOM_CSS)).strip()
+
+st.markdown(minified_css(), unsafe_allow_html=True)
+
+# Get API URL from environment or secrets; resolved once per server process
+@st.cache_resource
 def get_api_url():
     # Check Streamlit secrets first
     if "api_url" in st.secrets:
@@ -82,6 +123,192 @@ def get_api_url():
 
 API_URL = get_api_url()
 
+JSON_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+# Candidate re-encode qualities, lowest first, and the SSIM a preview must keep
+JPEG_QUALITIES = (70, 75, 80, 85)
+MIN_SSIM = 0.99
+
+# JPEG uploads within the size limit and at most this many bytes skip the re-encode
+PASSTHROUGH_MAX_BYTES = 500_000
+
+def block_ssim(a: np.ndarray, b: np.ndarray, block: int = 8) -> float:
+    """Mean SSIM over non-overlapping blocks of two greyscale images"""
+    h, w = (a.shape[0] // block) * block, (a.shape[1] // block) * block
+    a = a[:h, :w].reshape(h // block, block, w // block, block)
+    b = b[:h, :w].reshape(h // block, block, w // block, block)
+    mu_a, mu_b = a.mean(axis=(1, 3)), b.mean(axis=(1, 3))
+    var_a, var_b = a.var(axis=(1, 3)), b.var(axis=(1, 3))
+    cov = ((a - mu_a[:, None, :, None]) * (b - mu_b[:, None, :, None])).mean(axis=(1, 3))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    ssim = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim.mean())
+
+def choose_quality(img: Image.Image) -> int:
+    """Lowest JPEG quality whose 256px preview keeps MIN_SSIM against the original"""
+    # Flat, simple plates get away with fewer bytes than detailed ones
+    preview = ImageOps.contain(img, (256, 256))
+    reference = np.asarray(preview.convert('L'), dtype=np.float64)
+    for quality in JPEG_QUALITIES[:-1]:
+        buf = io.BytesIO()
+        preview.save(buf, format='JPEG', quality=quality)
+        encoded = np.asarray(Image.open(buf).convert('L'), dtype=np.float64)
+        if block_ssim(reference, encoded) >= MIN_SSIM:
+            return quality
+    return JPEG_QUALITIES[-1]
+
+def parse_json(response: requests.Response) -> dict:
+    """Decode a JSON response body, with orjson when it is installed"""
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def prepare_image(raw_image: bytes) -> Tuple[bytes, bool]:
+    """Flatten, downsize and re-encode an upload as JPEG; returns the bytes and whether it was resized"""
+    # Cached on the upload's bytes, so reruns and repeat clicks skip all image work
+    img = Image.open(io.BytesIO(raw_image))
+    max_size = 1024
+    
+    # A small JPEG is sent as-is: opening only read its header, and
+    # re-encoding it would cost time and often make it larger
+    if (img.format == 'JPEG' and img.mode in ('RGB', 'L')
+            and max(img.size) <= max_size and len(raw_image) <= PASSTHROUGH_MAX_BYTES):
+        return raw_image, False
+    
+    # Convert RGBA to RGB if needed
+    if img.mode == 'RGBA':
+        rgb_img = Image.new('RGB', img.size, (255, 255, 255))
+        rgb_img.paste(img, mask=img.split()[3])
+        img = rgb_img
+    
+    # Resize if too large (max 1024px on longest side)
+    resized = max(img.size) > max_size
+    if resized:
+        ratio = max_size / max(img.size)
+        new_size = tuple(int(dim * ratio) for dim in img.size)
+        # JPEGs decode straight from the DCT at the smallest 1/2, 1/4
+        # or 1/8 scale that still covers new_size; a no-op otherwise
+        img.draft('RGB', new_size)
+        # Whatever the draft left to shrink: a 3x+ downscale hides the difference
+        # between filters, so only modest ones pay for LANCZOS
+        if max(img.size) >= 3 * max_size:
+            resample = Image.Resampling.BILINEAR
+        else:
+            resample = Image.Resampling.LANCZOS
+        img = img.resize(new_size, resample)
+    
+    # Save optimized image to bytes; progressive scans come out a few percent
+    # smaller than baseline at the same quality
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format='JPEG', quality=choose_quality(img), optimize=True, progressive=True)
+    return img_buffer.getvalue(), resized
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def analyze_image(jpeg_bytes: bytes, notes: str) -> dict:
+    """Analyze an optimized JPEG; resubmitting the same photo is served from the cache"""
+    # The JPEG travels as raw multipart bytes, not base64 JSON
+    response = session.post(
+        f"{API_URL}/analyze/upload",
+        files={"image": ("food.jpg", jpeg_bytes, "image/jpeg")},
+        data={"notes": notes},
+        timeout=45,
+        headers=JSON_HEADERS,
+        stream=False  # Ensure response is not streamed
+    )
+    # Raising keeps error responses out of the cache
+    response.raise_for_status()
+    return parse_json(response)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def verify_profile(profile: dict) -> dict:
+    """Verify a nutrition profile; identical profiles are served from the cache"""
+    if ORJSON_AVAILABLE:
+        body = {'data': orjson.dumps(profile), 'headers': {**JSON_HEADERS, 'Content-Type': 'application/json'}}
+    else:
+        body = {'json': profile, 'headers': JSON_HEADERS}
+    response = session.post(
+        f"{API_URL}/verify",
+        timeout=45,
+        stream=False,
+        **body
+    )
+    response.raise_for_status()
+    return parse_json(response)
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Worker threads for requests that overlap rendering, shared by all sessions"""
+    return ThreadPoolExecutor(max_workers=4)
+
+def submit_with_context(fn, *args) -> Future:
+    """Run fn on the shared executor with this session's script context attached"""
+    # The context lets st.cache_data inside fn work off the script thread
+    ctx = get_script_run_ctx()
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+    return get_executor().submit(run)
+
+# Result sections are each sent as one markdown element rather than a
+# message per metric, column and line
+def metric_cells(items: List[Tuple[str, str]]) -> str:
+    """Table cells with a small label over a large value, like st.metric"""
+    return "".join(
+        f"<td style='padding:0.5rem 1rem'><small style='color:#757575'>{label}</small>"
+        f"<br><span style='font-size:1.5rem'>{value}</span></td>"
+        for label, value in items
+    )
+
+def profile_markdown(profile: dict) -> str:
+    """Nutrition profile headline figures and macro breakdown as one HTML block"""
+    macros = profile['macros']
+    cells = [
+        ("Food", html.escape(profile["name"].title())),
+        ("Calories", f"{profile['calories']:.0f}"),
+        ("Serving", f"{profile['serving_grams']}g"),
+        ("Protein", f"{macros['protein_g']}g"),
+    ]
+    macro_cells = [
+        ("Protein", f"{macros['protein_g']}g"),
+        ("Carbohydrates", f"{macros['carbs_g']}g"),
+        ("Fat", f"{macros['fat_g']}g"),
+    ]
+    return (
+        "### Nutrition Profile\n\n"
+        f"<table style='width:100%;border:none'><tr>{metric_cells(cells)}</tr></table>"
+        "<h4>Macronutrients</h4>"
+        f"<div class='metric-container'><table style='width:100%;border:none'><tr>{metric_cells(macro_cells)}</tr></table></div>"
+    )
+
+def verification_markdown(items: List[dict]) -> str:
+    """Verification claims and their evidence as one markdown block"""
+    lines = []
+    for item in items:
+        status = "Supported" if item["status"] == "supported" else "Flagged"
+        lines.append(f"**{status}:** {html.escape(item['claim'])}")
+        if item.get("evidence"):
+            lines.append(f"<small style='color:#757575'>Evidence: {html.escape(item['evidence'])}</small>")
+    return "\n\n".join(lines)
+
+def recipes_markdown(recipes: List[dict]) -> str:
+    """Recipe recommendations as collapsible <details> blocks in one HTML block"""
+    blocks = []
+    for recipe in recipes:
+        # &#36; keeps st.markdown from pairing dollar signs as LaTeX
+        ingredients = "".join(f"<li>{html.escape(i)}</li>" for i in recipe["ingredients"])
+        steps = "".join(f"<li>{html.escape(step)}</li>" for step in recipe["steps"])
+        blocks.append(
+            f"<details><summary>{html.escape(recipe['title'])} - {recipe['time_minutes']} mins"
+            f" | &#36;{recipe['cost_estimate_usd']:.2f}</summary>"
+            f"<b>Ingredients:</b><ul>{ingredients}</ul><b>Steps:</b><ol>{steps}</ol></details>"
+        )
+    return "### Recipe Recommendations\n\n" + "".join(blocks)
+
 # Header
 st.markdown("# NutriGuide+")
 st.markdown("### AI-Powered Nutrition Analysis & Recipe Recommendations")
@@ -99,141 +326,73 @@ with col2:
     st.markdown('<p class="upload-text">Add notes (optional)</p>', unsafe_allow_html=True)
     notes = st.text_input("", placeholder="e.g., allergies, preferences", key="notes_input")
 
-# Analysis section
-if uploaded_file:
+# Analysis section; as a fragment, the Analyze button reruns only this panel
+@st.fragment
+def analysis_panel(uploaded_file, notes):
+    """Upload preview, analysis request and results"""
+    if not uploaded_file:
+        return
+    
+    # Read the upload once; display and analysis share the same bytes
+    raw_image = uploaded_file.getvalue()
+    
     # Display uploaded image
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image(uploaded_file, caption="Uploaded food image", use_column_width=True)
+        st.image(raw_image, caption="Uploaded food image", use_column_width=True)
     
     # Analyze button
     if st.button("Analyze Nutrition", key="analyze_btn", use_container_width=True):
         try:
             with st.spinner("Analyzing your food..."):
-                # Optimize image before encoding
-                uploaded_file.seek(0)  # Reset file pointer
-                img = Image.open(uploaded_file)
-                
-                # Convert RGBA to RGB if needed
-                if img.mode == 'RGBA':
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    rgb_img.paste(img, mask=img.split()[3])
-                    img = rgb_img
-                
-                # Resize if too large (max 1024px on longest side)
-                max_size = 1024
-                if max(img.size) > max_size:
-                    ratio = max_size / max(img.size)
-                    new_size = tuple(int(dim * ratio) for dim in img.size)
-                    img = img.resize(new_size, Image.Resampling.LANCZOS)
+                jpeg_bytes, resized = prepare_image(raw_image)
+                if resized:
                     st.info("Image resized for optimal processing.")
                 
-                # Save optimized image to bytes
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format='JPEG', quality=85, optimize=True)
-                img_buffer.seek(0)
-                b64_image = base64.b64encode(img_buffer.read()).decode()
+                recommendation = analyze_image(jpeg_bytes, notes)
+                profile = recommendation["profile"]
                 
-                # Prepare request
-                analyze_url = f"{API_URL}/analyze"
-                payload = {"image_b64": b64_image, "notes": notes}
+                # Start verifying now so the request overlaps rendering the
+                # profile and recipes
+                verify_future = submit_with_context(verify_profile, profile)
                 
-                # Call analyze endpoint with proper headers and streaming
-                headers = {
-                    'Content-Type': 'application/json',
-                    'Accept': 'application/json',
-                    'Accept-Encoding': 'gzip, deflate'
-                }
+                # Display nutrition profile and macros in one element
+                st.markdown(profile_markdown(profile), unsafe_allow_html=True)
                 
-                analyze_response = session.post(
-                    analyze_url,
-                    json=payload,
-                    timeout=45,  # Increase timeout
-                    headers=headers,
-                    stream=False  # Ensure response is not streamed
-                )
+                # Keep the report's place above the recipes, which render first
+                verification_slot = st.container()
                 
-                if analyze_response.status_code == 200:
-                    recommendation = analyze_response.json()
-                    
-                    # Display nutrition profile
-                    st.markdown("### Nutrition Profile")
-                    profile = recommendation["profile"]
-                    
-                    col1, col2, col3, col4 = st.columns(4)
-                    with col1:
-                        st.metric("Food", profile["name"].title())
-                    with col2:
-                        st.metric("Calories", f"{profile['calories']:.0f}")
-                    with col3:
-                        st.metric("Serving", f"{profile['serving_grams']}g")
-                    with col4:
-                        st.metric("Protein", f"{profile['macros']['protein_g']}g")
-                    
-                    # Macros breakdown
-                    st.markdown("#### Macronutrients")
-                    macro_cols = st.columns(3)
-                    with macro_cols[0]:
-                        st.info(f"Protein: {profile['macros']['protein_g']}g")
-                    with macro_cols[1]:
-                        st.info(f"Carbohydrates: {profile['macros']['carbs_g']}g")
-                    with macro_cols[2]:
-                        st.info(f"Fat: {profile['macros']['fat_g']}g")
-                    
+                # Recipe recommendations
+                st.markdown(recipes_markdown(recommendation["recipes"]), unsafe_allow_html=True)
+                
+                with verification_slot:
                     # Verify nutrition data
                     with st.spinner("Verifying nutrition data..."):
-                        verify_response = session.post(
-                            f"{API_URL}/verify",
-                            json=profile,
-                            timeout=45,
-                            headers=headers,
-                            stream=False
-                        )
-                        
-                        if verify_response.status_code == 200:
-                            verification = verify_response.json()
-                            
+                        try:
+                            verification = verify_future.result()
+                        except requests.exceptions.HTTPError:
+                            verification = None
+                    
+                        if verification is not None:
                             st.markdown("### Verification Report")
                             confidence = verification["overall_confidence"]
-                            
+                        
                             if confidence > 0.7:
                                 st.success(f"High confidence: {confidence:.0%}")
                             elif confidence > 0.5:
                                 st.warning(f"Medium confidence: {confidence:.0%}")
                             else:
                                 st.error(f"Low confidence: {confidence:.0%}")
-                            
+                        
                             # Show verification details
-                            with st.container():
-                                for item in verification["items"]:
-                                    if item["status"] == "supported":
-                                        st.markdown(f"**Supported:** {item['claim']}")
-                                    else:
-                                        st.markdown(f"**Flagged:** {item['claim']}")
-                                    if item.get("evidence"):
-                                        st.caption(f"Evidence: {item['evidence']}")
-                    
-                    # Recipe recommendations
-                    st.markdown("### Recipe Recommendations")
-                    recipes = recommendation["recipes"]
-                    
-                    for i, recipe in enumerate(recipes):
-                        with st.expander(f"{recipe['title']} - {recipe['time_minutes']} mins | ${recipe['cost_estimate_usd']:.2f}"):
-                            st.markdown("**Ingredients:**")
-                            for ingredient in recipe["ingredients"]:
-                                st.markdown(f"• {ingredient}")
-                            
-                            st.markdown("**Steps:**")
-                            for j, step in enumerate(recipe["steps"]):
-                                st.markdown(f"{j+1}. {step}")
-                
-                else:
-                    st.error(f"Error analyzing image: {analyze_response.status_code}")
-                    st.error(f"Response: {analyze_response.text}")
+                            st.markdown(verification_markdown(verification["items"]), unsafe_allow_html=True)
                     
         except requests.exceptions.Timeout:
             st.error("Request timed out. Please try again with a smaller image.")
             st.info("Tip: Try uploading a photo under 5MB for faster processing.")
+        except requests.exceptions.HTTPError as e:
+            st.error(f"Error analyzing image: {e.response.status_code}")
+            st.error(f"Response: {e.response.text}")
         except requests.exceptions.ChunkedEncodingError as e:
             st.error("Network error: The connection was interrupted.")
             st.info("This usually happens with unstable connections. Please try again.")
@@ -253,6 +412,8 @@ if uploaded_file:
             st.error(f"Error type: {type(e).__name__}")
             st.info("If this persists, please try refreshing the page.")
 
+analysis_panel(uploaded_file, notes)
+
 # Footer
 st.markdown("---")
 st.markdown(